@@ -1,8 +1,12 @@
 """Main game-playing loop: multi-turn tool-use with OmniParser."""
 
+import hashlib
 import logging
+import re
 import signal
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -22,6 +26,16 @@ from andrey.vision import ConversationClient, VisionError
 
 logger = logging.getLogger(__name__)
 
+# Matches "game over" / "game ended" in Claude's free-text replies
+_GAME_OVER_RE = re.compile(r"game (?:over|ended)", re.IGNORECASE)
+
+# press_key tool values -> Android keycodes
+_KEYCODES = {
+    "BACK": "KEYCODE_BACK",
+    "HOME": "KEYCODE_HOME",
+    "ENTER": "KEYCODE_ENTER",
+}
+
 
 class AgentLoop:
     """Orchestrates the screenshot-analyze-act game loop.
@@ -35,6 +49,7 @@ class AgentLoop:
             serial=config.device.serial,
             adb_host=config.device.adb_host,
             adb_port=config.device.adb_port,
+            raw_screencap=config.device.raw_screencap,
         )
         self._game_profile = load_game_profile(config.game_profile)
         self._conversation: Optional[ConversationClient] = None
@@ -48,6 +63,11 @@ class AgentLoop:
                 box_threshold=config.omniparser.box_threshold,
                 iou_threshold=config.omniparser.iou_threshold,
                 use_paddleocr=config.omniparser.use_paddleocr,
+                inference_width=config.omniparser.inference_width,
+                half_precision=config.omniparser.half_precision,
+                quantize_caption=config.omniparser.quantize_caption,
+                tensorrt=config.omniparser.tensorrt,
+                ad_cutoff_ratio=config.omniparser.ad_cutoff_ratio,
             )
         else:
             self._omniparser = None
@@ -57,11 +77,22 @@ class AgentLoop:
         self._consecutive_errors = 0
         self._no_change_count = 0
         self._last_screenshot_hash: Optional[int] = None
+        self._last_input_time: Optional[float] = None  # monotonic time of last device input
+        self._last_fg_check: Optional[float] = None  # monotonic time of last check
         self._running = False
         self._screenshot_dir = Path(config.screenshot_dir)
 
         # Current detected elements (updated each step)
         self._elements: list[UIElement] = []
+        self._elements_by_id: dict[int, UIElement] = {}
+
+        # OmniParser results by exact frame digest (LRU), reused for repeat frames
+        self._parse_cache: OrderedDict[bytes, ParseResult] = OrderedDict()
+
+        # Screenshot JPEG encoding/writing happens off the loop thread
+        self._save_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="andrey-save"
+        )
 
     def run(self, extra_context: Optional[str] = None) -> None:
         """Start the game-playing loop."""
@@ -98,6 +129,9 @@ class AgentLoop:
                 tools=TOOL_DEFINITIONS,
                 system_prompt=system_prompt,
                 max_images=self._config.conversation.max_images,
+                max_image_dim=self._config.conversation.max_image_dim,
+                max_context_tokens=self._config.conversation.max_context_tokens,
+                image_format=self._config.conversation.image_format,
             )
 
             # Launch app
@@ -125,6 +159,7 @@ class AgentLoop:
                     self._run_step()
                     self._consecutive_errors = 0
                 except DeviceError as e:
+                    self._last_fg_check = None  # re-verify foreground app next step
                     self._handle_error(f"Device error: {e}")
                     if not self._device.is_connected():
                         logger.error("Device disconnected. Stopping.")
@@ -141,26 +176,25 @@ class AgentLoop:
 
         finally:
             signal.signal(signal.SIGINT, original_sigint)
+            self._save_executor.shutdown(wait=True)
             self._print_summary()
 
     def _send_initial_screenshot(self) -> None:
         """Capture the first screenshot and send it to Claude."""
         self._check_foreground_app()
-        screenshot = self._capture_stable_screenshot()
-        parse_result = self._parse_screenshot(screenshot)
-        self._elements = parse_result.elements
+        screenshot, _ = self._capture_stable_screenshot()
+        frame_digest = self._frame_digest(screenshot)
+        parse_result = self._parse_screenshot(screenshot, frame_digest)
+        self._set_elements(parse_result.elements)
 
         self._save_screenshot(
             screenshot, f"step_{self._step:04d}",
             annotated=parse_result.annotated_image,
         )
 
-        screen_h = self._device.screen_info.height
-        elements_text = OmniParserClient.format_elements_text(
-            self._elements, screen_height=screen_h
-        )
+        elements_text = OmniParserClient.format_elements_text(self._elements)
         self._last_response = self._conversation.send_screenshot(
-            parse_result.annotated_image, elements_text
+            parse_result.annotated_image, elements_text, image_hash=frame_digest
         )
 
     def _run_step(self) -> None:
@@ -172,8 +206,7 @@ class AgentLoop:
             if response.text:
                 logger.info(f"  Claude: {response.text[:200]}")
                 logger.debug(f"  Claude (full): {response.text}")
-            text_lower = response.text.lower()
-            if "game over" in text_lower or "game ended" in text_lower:
+            if _GAME_OVER_RE.search(response.text):
                 logger.info("Game over detected in response text.")
                 self._running = False
                 return
@@ -189,7 +222,12 @@ class AgentLoop:
         if response.text:
             logger.debug(f"  Claude text: {response.text}")
 
-        for tool_call in response.tool_calls:
+        # Claude picks every call in a batch from the same screen, so with
+        # observe_last_tool_only only the final call captures and parses.
+        observe_last_only = self._config.loop.observe_last_tool_only
+        last_index = len(response.tool_calls) - 1
+
+        for index, tool_call in enumerate(response.tool_calls):
             self._step += 1
             logger.info(
                 f"  Step {self._step}: {tool_call.tool_name} "
@@ -201,7 +239,9 @@ class AgentLoop:
             pre_hash = self._last_screenshot_hash
 
             # Execute the tool
-            result = self._execute_tool(tool_call, self._elements)
+            result = self._execute_tool(tool_call, self._elements_by_id)
+            if tool_call.tool_name != "wait":
+                self._last_input_time = time.monotonic()
             logger.debug(f"  Result: {result.get('text_result', '')}")
 
             if result.get("should_stop"):
@@ -212,14 +252,24 @@ class AgentLoop:
             if tool_call.tool_name not in ("wait", "game_over"):
                 time.sleep(self._config.loop.delay_seconds)
 
+            if observe_last_only and index < last_index:
+                result["text_result"] = result["text_result"].replace(
+                    " Here is the resulting screen.",
+                    " The screen is captured after the last action in this turn.",
+                )
+                tool_results.append(result)
+                if self._step >= self._config.loop.max_steps:
+                    logger.warning(f"Reached max steps ({self._config.loop.max_steps}).")
+                    break
+                continue
+
             # Check foreground app
             self._check_foreground_app()
 
             # Capture result screenshot
-            result_screenshot = self._capture_stable_screenshot()
+            result_screenshot, post_hash = self._capture_stable_screenshot()
 
             # Screen change detection
-            post_hash = self._screenshot_hash(result_screenshot)
             if pre_hash is not None and post_hash == pre_hash:
                 self._no_change_count += 1
                 result["text_result"] += (
@@ -236,8 +286,9 @@ class AgentLoop:
             self._last_screenshot_hash = post_hash
 
             # Parse result screenshot with OmniParser
-            result_parse = self._parse_screenshot(result_screenshot)
-            self._elements = result_parse.elements
+            frame_digest = self._frame_digest(result_screenshot)
+            result_parse = self._parse_screenshot(result_screenshot, frame_digest)
+            self._set_elements(result_parse.elements)
 
             self._save_screenshot(
                 result_screenshot, f"step_{self._step:04d}",
@@ -245,13 +296,13 @@ class AgentLoop:
             )
 
             result["image"] = result_parse.annotated_image
+            result["image_hash"] = frame_digest
             result["elements_text"] = OmniParserClient.format_elements_text(
-                self._elements,
-                screen_height=self._device.screen_info.height,
+                self._elements
             )
             logger.debug(
                 f"  Elements detected: {len(self._elements)} "
-                f"(filtered text sent to Claude below)"
+                f"(text sent to Claude below)"
             )
             logger.debug(f"  {result['elements_text']}")
 
@@ -273,166 +324,232 @@ class AgentLoop:
         # Submit all tool results back to Claude
         self._last_response = self._conversation.submit_tool_results(tool_results)
 
+    def _set_elements(self, elements: list[UIElement]) -> None:
+        """Replace the current detected elements and their ID index."""
+        self._elements = elements
+        self._elements_by_id = {el.id: el for el in elements}
+
     def _execute_tool(
-        self, tool_call: ToolCall, elements: list[UIElement]
+        self, tool_call: ToolCall, elements: dict[int, UIElement]
     ) -> dict:
         """Execute a tool call on the device. Returns a result dict."""
-        name = tool_call.tool_name
-        inp = tool_call.tool_input
-
-        if name == "tap_element":
-            element_id = inp.get("element_id", -1)
-            # Find element by ID
-            element = None
-            for el in elements:
-                if el.id == element_id:
-                    element = el
-                    break
-
-            if element is None:
-                logger.warning(f"Element ID {element_id} not found in detected elements")
-                return {
-                    "tool_use_id": tool_call.tool_use_id,
-                    "text_result": (
-                        f"Error: Element ID {element_id} not found. "
-                        f"Available IDs: {[e.id for e in elements]}. "
-                        f"Use tap(x, y) with coordinates instead."
-                    ),
-                    "is_error": True,
-                }
-
-            logger.info(
-                f"  tap_element({element_id}) → "
-                f"({element.center_x}, {element.center_y}) "
-                f"'{element.content}'"
-            )
-            action = GameAction(
-                action=ActionType.TAP,
-                x=element.center_x,
-                y=element.center_y,
-                reasoning=inp.get("reasoning", ""),
-            )
-            self._device.execute_action(action)
+        handler = self._TOOL_HANDLERS.get(tool_call.tool_name)
+        if handler is None:
+            logger.warning(f"  Unknown tool: {tool_call.tool_name}")
             return {
                 "tool_use_id": tool_call.tool_use_id,
-                "text_result": (
-                    f"Tapped element [{element_id}] '{element.content}' "
-                    f"at ({element.center_x}, {element.center_y}). "
-                    f"Here is the resulting screen."
-                ),
-            }
-
-        elif name == "tap":
-            x, y = inp.get("x", 0), inp.get("y", 0)
-            action = GameAction(
-                action=ActionType.TAP, x=x, y=y,
-                reasoning=inp.get("reasoning", ""),
-            )
-            self._device.execute_action(action)
-            return {
-                "tool_use_id": tool_call.tool_use_id,
-                "text_result": (
-                    f"Tapped at ({x}, {y}). Here is the resulting screen."
-                ),
-            }
-
-        elif name == "swipe":
-            action = GameAction(
-                action=ActionType.SWIPE,
-                x=inp.get("x1", 0),
-                y=inp.get("y1", 0),
-                x2=inp.get("x2", 0),
-                y2=inp.get("y2", 0),
-                duration=inp.get("duration", 0.5),
-                reasoning=inp.get("reasoning", ""),
-            )
-            self._device.execute_action(action)
-            return {
-                "tool_use_id": tool_call.tool_use_id,
-                "text_result": (
-                    f"Swiped from ({inp.get('x1')},{inp.get('y1')}) "
-                    f"to ({inp.get('x2')},{inp.get('y2')}). "
-                    f"Here is the resulting screen."
-                ),
-            }
-
-        elif name == "long_press":
-            action = GameAction(
-                action=ActionType.LONG_PRESS,
-                x=inp.get("x", 0),
-                y=inp.get("y", 0),
-                duration=inp.get("duration", 1.0),
-                reasoning=inp.get("reasoning", ""),
-            )
-            self._device.execute_action(action)
-            return {
-                "tool_use_id": tool_call.tool_use_id,
-                "text_result": (
-                    f"Long pressed at ({inp.get('x')}, {inp.get('y')}) "
-                    f"for {inp.get('duration', 1.0)}s. Here is the resulting screen."
-                ),
-            }
-
-        elif name == "press_key":
-            key = inp.get("key", "BACK")
-            key_map = {
-                "BACK": "KEYCODE_BACK",
-                "HOME": "KEYCODE_HOME",
-                "ENTER": "KEYCODE_ENTER",
-            }
-            keycode = key_map.get(key, "KEYCODE_BACK")
-            self._device._device.keyevent(keycode)
-            logger.info(f"  Pressed {key}")
-            return {
-                "tool_use_id": tool_call.tool_use_id,
-                "text_result": (
-                    f"Pressed {key} key. Here is the resulting screen."
-                ),
+                "text_result": f"Unknown tool: {tool_call.tool_name}",
+                "is_error": True,
             }
+        return handler(self, tool_call, elements)
 
-        elif name == "wait":
-            wait_secs = inp.get("seconds", 2.0)
-            logger.info(f"  Waiting {wait_secs}s: {inp.get('reasoning', '')}")
-            time.sleep(wait_secs)
+    def _tool_tap_element(
+        self, tool_call: ToolCall, elements: dict[int, UIElement]
+    ) -> dict:
+        inp = tool_call.tool_input
+        element_id = inp.get("element_id", -1)
+        element = elements.get(element_id)
+        if element is None:
+            logger.warning(f"Element ID {element_id} not found in detected elements")
             return {
                 "tool_use_id": tool_call.tool_use_id,
                 "text_result": (
-                    f"Waited {wait_secs} seconds. Here is the resulting screen."
+                    f"Error: Element ID {element_id} not found. "
+                    f"Available IDs: {list(elements)}. "
+                    f"Use tap(x, y) with coordinates instead."
                 ),
-            }
-
-        elif name == "game_over":
-            reason = inp.get("reason", "Game ended")
-            logger.info(f"  Game over: {reason}")
-            return {
-                "tool_use_id": tool_call.tool_use_id,
-                "text_result": f"Game over acknowledged: {reason}",
-                "should_stop": True,
-            }
-
-        else:
-            logger.warning(f"  Unknown tool: {name}")
-            return {
-                "tool_use_id": tool_call.tool_use_id,
-                "text_result": f"Unknown tool: {name}",
                 "is_error": True,
             }
 
-    def _parse_screenshot(self, screenshot: Image.Image) -> ParseResult:
-        """Run OmniParser on a screenshot, or return raw image if disabled."""
-        if self._omniparser and self._omniparser.available:
+        logger.info(
+            f"  tap_element({element_id}) → "
+            f"({element.center_x}, {element.center_y}) "
+            f"'{element.content}'"
+        )
+        action = GameAction(
+            action=ActionType.TAP,
+            x=element.center_x,
+            y=element.center_y,
+            reasoning=inp.get("reasoning", ""),
+        )
+        self._device.execute_action(action)
+        return {
+            "tool_use_id": tool_call.tool_use_id,
+            "text_result": (
+                f"Tapped element [{element_id}] '{element.content}' "
+                f"at ({element.center_x}, {element.center_y}). "
+                f"Here is the resulting screen."
+            ),
+        }
+
+    def _tool_tap(self, tool_call: ToolCall, elements: dict[int, UIElement]) -> dict:
+        inp = tool_call.tool_input
+        x, y = inp.get("x", 0), inp.get("y", 0)
+        action = GameAction(
+            action=ActionType.TAP, x=x, y=y,
+            reasoning=inp.get("reasoning", ""),
+        )
+        self._device.execute_action(action)
+        return {
+            "tool_use_id": tool_call.tool_use_id,
+            "text_result": (
+                f"Tapped at ({x}, {y}). Here is the resulting screen."
+            ),
+        }
+
+    def _tool_swipe(self, tool_call: ToolCall, elements: dict[int, UIElement]) -> dict:
+        inp = tool_call.tool_input
+        action = GameAction(
+            action=ActionType.SWIPE,
+            x=inp.get("x1", 0),
+            y=inp.get("y1", 0),
+            x2=inp.get("x2", 0),
+            y2=inp.get("y2", 0),
+            duration=inp.get("duration", 0.5),
+            reasoning=inp.get("reasoning", ""),
+        )
+        self._device.execute_action(action)
+        return {
+            "tool_use_id": tool_call.tool_use_id,
+            "text_result": (
+                f"Swiped from ({inp.get('x1')},{inp.get('y1')}) "
+                f"to ({inp.get('x2')},{inp.get('y2')}). "
+                f"Here is the resulting screen."
+            ),
+        }
+
+    def _tool_long_press(
+        self, tool_call: ToolCall, elements: dict[int, UIElement]
+    ) -> dict:
+        inp = tool_call.tool_input
+        action = GameAction(
+            action=ActionType.LONG_PRESS,
+            x=inp.get("x", 0),
+            y=inp.get("y", 0),
+            duration=inp.get("duration", 1.0),
+            reasoning=inp.get("reasoning", ""),
+        )
+        self._device.execute_action(action)
+        return {
+            "tool_use_id": tool_call.tool_use_id,
+            "text_result": (
+                f"Long pressed at ({inp.get('x')}, {inp.get('y')}) "
+                f"for {inp.get('duration', 1.0)}s. Here is the resulting screen."
+            ),
+        }
+
+    def _tool_press_key(
+        self, tool_call: ToolCall, elements: dict[int, UIElement]
+    ) -> dict:
+        key = tool_call.tool_input.get("key", "BACK")
+        keycode = _KEYCODES.get(key, "KEYCODE_BACK")
+        self._device._device.keyevent(keycode)
+        logger.info(f"  Pressed {key}")
+        return {
+            "tool_use_id": tool_call.tool_use_id,
+            "text_result": (
+                f"Pressed {key} key. Here is the resulting screen."
+            ),
+        }
+
+    def _tool_wait(self, tool_call: ToolCall, elements: dict[int, UIElement]) -> dict:
+        inp = tool_call.tool_input
+        wait_secs = inp.get("seconds", 2.0)
+        logger.info(f"  Waiting {wait_secs}s: {inp.get('reasoning', '')}")
+        time.sleep(wait_secs)
+        return {
+            "tool_use_id": tool_call.tool_use_id,
+            "text_result": (
+                f"Waited {wait_secs} seconds. Here is the resulting screen."
+            ),
+        }
+
+    def _tool_game_over(
+        self, tool_call: ToolCall, elements: dict[int, UIElement]
+    ) -> dict:
+        reason = tool_call.tool_input.get("reason", "Game ended")
+        logger.info(f"  Game over: {reason}")
+        return {
+            "tool_use_id": tool_call.tool_use_id,
+            "text_result": f"Game over acknowledged: {reason}",
+            "should_stop": True,
+        }
+
+    # Tool name -> handler, one entry per tool in TOOL_DEFINITIONS
+    _TOOL_HANDLERS = {
+        "tap_element": _tool_tap_element,
+        "tap": _tool_tap,
+        "swipe": _tool_swipe,
+        "long_press": _tool_long_press,
+        "press_key": _tool_press_key,
+        "wait": _tool_wait,
+        "game_over": _tool_game_over,
+    }
+
+    def _parse_screenshot(
+        self, screenshot: Image.Image, frame_digest: Optional[bytes] = None
+    ) -> ParseResult:
+        """Run OmniParser on a screenshot, or return raw image if disabled.
+
+        Results are cached by exact frame digest, so a pixel-identical
+        screen (no-op tap, wait, re-sent observation) skips detection
+        entirely. The perceptual _screenshot_hash is too coarse for this:
+        a changed score or bid often hashes the same.
+        """
+        if not (self._omniparser and self._omniparser.available):
+            return ParseResult(annotated_image=screenshot, elements=[])
+
+        cache_size = self._config.omniparser.cache_size
+        if frame_digest is None or cache_size <= 0:
             return self._omniparser.parse(screenshot)
-        return ParseResult(annotated_image=screenshot, elements=[])
 
-    def _capture_stable_screenshot(self) -> Image.Image:
-        """Capture screenshot, waiting for screen to stabilize."""
+        cached = self._parse_cache.get(frame_digest)
+        if cached is not None:
+            self._parse_cache.move_to_end(frame_digest)
+            logger.debug("OmniParser: reusing cached result for unchanged screen")
+            return cached
+
+        result = self._omniparser.parse(screenshot)
+        # Empty results may be a failed detection; don't make them sticky
+        if result.elements:
+            self._parse_cache[frame_digest] = result
+            if len(self._parse_cache) > cache_size:
+                self._parse_cache.popitem(last=False)
+        return result
+
+    def _capture_stable_screenshot(self) -> tuple[Image.Image, int]:
+        """Capture screenshot, waiting for screen to stabilize.
+
+        Returns the screenshot and its hash. A first capture that matches
+        the last stable screen is returned without polling once the game
+        has had at least one stabilization_interval since the last input
+        (always the case after a wait). Sooner than that, the input may
+        simply not have rendered yet, so one re-capture an interval later
+        has to confirm the screen is unchanged.
+        """
         timeout = self._config.conversation.stabilization_timeout
         interval = self._config.conversation.stabilization_interval
 
-        prev_hash = None
+        screenshot = self._device.screenshot()
+        current_hash = self._screenshot_hash(screenshot)
+        if current_hash == self._last_screenshot_hash:
+            since_input = (
+                time.monotonic() - self._last_input_time
+                if self._last_input_time is not None
+                else interval
+            )
+            if since_input >= interval:
+                return screenshot, current_hash
+            time.sleep(interval)
+            screenshot = self._device.screenshot()
+            current_hash = self._screenshot_hash(screenshot)
+            if current_hash == self._last_screenshot_hash:
+                return screenshot, current_hash
+
+        prev_hash = current_hash
         stable_count = 0
         start = time.monotonic()
-        screenshot = None
+        time.sleep(interval)
 
         while time.monotonic() - start < timeout:
             screenshot = self._device.screenshot()
@@ -441,37 +558,57 @@ class AgentLoop:
             if current_hash == prev_hash:
                 stable_count += 1
                 if stable_count >= 2:
-                    return screenshot
+                    return screenshot, current_hash
             else:
                 stable_count = 0
 
             prev_hash = current_hash
             time.sleep(interval)
 
-        if screenshot is None:
-            screenshot = self._device.screenshot()
-
         logger.debug("Screen stabilization timed out, using latest screenshot")
-        return screenshot
+        return screenshot, current_hash
 
     @staticmethod
     def _screenshot_hash(image: Image.Image) -> int:
         """Compute a quick perceptual hash for change detection.
 
-        Crops the bottom 10% of the screen to ignore ad banners that
-        cycle independently of game state.
+        Ignores the bottom 10% of the screen, where ad banners cycle
+        independently of game state; the region is passed as resize's box
+        so no cropped copy is allocated. BOX resampling is a plain
+        average-pool, several times cheaper than the default bicubic filter.
+
+        The digest is BLAKE2b rather than hash(), which is salted per
+        process, so values are stable across runs.
         """
         w, h = image.size
-        cropped = image.crop((0, 0, w, int(h * 0.9)))
-        thumb = cropped.resize((16, 16)).convert("L")
-        return hash(thumb.tobytes())
+        thumb = image.resize((16, 16), Image.BOX, box=(0, 0, w, int(h * 0.9)))
+        digest = hashlib.blake2b(thumb.convert("L").tobytes(), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    @staticmethod
+    def _frame_digest(image: Image.Image) -> bytes:
+        """Exact digest of a frame's pixels, for caching and upload dedupe.
+
+        Unlike _screenshot_hash, any pixel change gives a new digest.
+        """
+        return hashlib.blake2b(image.tobytes(), digest_size=16).digest()
 
     def _check_foreground_app(self) -> None:
-        """Ensure the correct app is in the foreground."""
+        """Ensure the correct app is in the foreground.
+
+        The dumpsys round-trip is skipped if the last check was less than
+        foreground_check_interval seconds ago.
+        """
         app_package = self._game_profile.get("app_package")
         if not app_package:
             return
 
+        now = time.monotonic()
+        interval = self._config.loop.foreground_check_interval
+        if self._last_fg_check is not None and now - self._last_fg_check < interval:
+            return
+        self._last_fg_check = now
+
         fg = self._device.get_foreground_package()
         if fg and fg != app_package:
             logger.warning(
@@ -484,13 +621,24 @@ class AgentLoop:
     def _save_screenshot(
         self, screenshot: Image.Image, name: str, annotated: Image.Image = None
     ) -> None:
-        """Save screenshot(s) to disk if configured."""
+        """Queue screenshot(s) to be written to disk if configured.
+
+        Images are copied first so the writer thread never shares a lazily
+        decoded image with the loop.
+        """
         if self._config.save_screenshots:
             path = self._screenshot_dir / f"{name}.jpg"
-            screenshot.save(str(path), quality=85)
+            self._save_executor.submit(self._write_jpeg, screenshot.copy(), path)
         if annotated is not None and self._config.save_annotated:
             path = self._screenshot_dir / f"{name}_annotated.jpg"
-            annotated.save(str(path), quality=85)
+            self._save_executor.submit(self._write_jpeg, annotated.copy(), path)
+
+    @staticmethod
+    def _write_jpeg(image: Image.Image, path: Path) -> None:
+        try:
+            image.save(str(path), quality=85)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to save screenshot {path.name}: {e}")
 
     def _handle_error(self, message: str) -> None:
         self._consecutive_errors += 1
@@ -510,6 +658,7 @@ class AgentLoop:
             logger.info(
                 f"Total tokens: "
                 f"in={self._conversation.total_input_tokens}, "
-                f"out={self._conversation.total_output_tokens}"
+                f"out={self._conversation.total_output_tokens}, "
+                f"cache_read={self._conversation.total_cache_read_tokens}"
             )
             logger.info(f"Conversation turns: {self._conversation.turn_count}")
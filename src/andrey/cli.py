@@ -5,9 +5,7 @@ from typing import Optional
 import click
 
 from andrey.config import load_config
-from andrey.device import DeviceManager
 from andrey.logger import setup_logging
-from andrey.vision import VisionClient
 
 
 @click.group()
@@ -28,26 +26,32 @@ def main(ctx, config: Optional[str], verbose: bool):
 @click.option("--profile", "-p", default=None, help="Game profile name (e.g., 'spades')")
 @click.option("--device", "-d", default=None, help="Device serial number")
 @click.option("--delay", type=float, default=None, help="Delay between steps (seconds)")
+@click.option("--fast", is_flag=True, help="No fixed delay after actions; wait only for the screen to settle")
 @click.option("--steps", "-n", type=int, default=None, help="Maximum number of steps (actions)")
 @click.option("--context", type=str, default=None, help="Extra context for the LLM")
-@click.option("--max-images", type=int, default=None, help="Max screenshots in conversation context")
+@click.option("--max-images", type=int, default=None, help="Screenshots kept in context (up to 4 more build up between trims)")
 @click.option("--omniparser-path", type=str, default=None, help="Path to OmniParser repo")
 @click.option("--no-omniparser", is_flag=True, help="Disable OmniParser element detection")
 @click.option("--save-annotated", is_flag=True, help="Save OmniParser annotated screenshots for debugging")
 @click.pass_context
-def play(ctx, profile, device, delay, steps, context, max_images,
+def play(ctx, profile, device, delay, fast, steps, context, max_images,
          omniparser_path, no_omniparser, save_annotated):
     """Start playing a game automatically."""
     from andrey.agent import AgentLoop
 
     config = ctx.obj["config"]
 
+    if fast and delay is not None:
+        raise click.UsageError("--fast and --delay are mutually exclusive.")
+
     if profile:
         config.game_profile = profile
     if device:
         config.device.serial = device
     if delay is not None:
         config.loop.delay_seconds = delay
+    if fast:
+        config.loop.delay_seconds = 0.0
     if steps is not None:
         config.loop.max_steps = steps
     if max_images is not None:
@@ -77,6 +81,9 @@ def play(ctx, profile, device, delay, steps, context, max_images,
 @click.pass_context
 def screenshot(ctx, device, save):
     """Take a screenshot and describe what's on screen."""
+    from andrey.device import DeviceManager
+    from andrey.vision import VisionClient
+
     config = ctx.obj["config"]
     if device:
         config.device.serial = device
@@ -85,6 +92,7 @@ def screenshot(ctx, device, save):
         serial=config.device.serial,
         adb_host=config.device.adb_host,
         adb_port=config.device.adb_port,
+        raw_screencap=config.device.raw_screencap,
     )
     dm.connect()
 
@@ -113,6 +121,8 @@ def screenshot(ctx, device, save):
 @click.pass_context
 def tap(ctx, x, y, device):
     """Manually tap at the given coordinates."""
+    from andrey.device import DeviceManager
+
     config = ctx.obj["config"]
     if device:
         config.device.serial = device
@@ -128,9 +138,12 @@ def tap(ctx, x, y, device):
 
 
 @main.command()
+@click.option("--check", is_flag=True, help="Also check that each device responds")
 @click.pass_context
-def devices(ctx):
+def devices(ctx, check):
     """List connected ADB devices."""
+    from andrey.device import DeviceManager
+
     config = ctx.obj["config"]
     serials = DeviceManager.list_devices(
         adb_host=config.device.adb_host,
@@ -138,7 +151,18 @@ def devices(ctx):
     )
     if not serials:
         click.echo("No devices connected.")
-    else:
-        click.echo(f"Connected devices ({len(serials)}):")
-        for s in serials:
-            click.echo(f"  - {s}")
+        return
+
+    health = {}
+    if check:
+        health = DeviceManager.ping_devices(
+            serials,
+            adb_host=config.device.adb_host,
+            adb_port=config.device.adb_port,
+        )
+    click.echo(f"Connected devices ({len(serials)}):")
+    for s in serials:
+        status = ""
+        if check:
+            status = " (ok)" if health[s] else " (not responding)"
+        click.echo(f"  - {s}{status}")
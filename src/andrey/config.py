@@ -2,11 +2,14 @@
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 import yaml
 from pydantic import BaseModel
 
+# libyaml-backed loader when PyYAML was built with it
+_YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class AnthropicConfig(BaseModel):
     api_key: str = ""
@@ -16,22 +19,28 @@ class AnthropicConfig(BaseModel):
 
 
 class LoopConfig(BaseModel):
-    delay_seconds: float = 1.0
+    delay_seconds: float = 0.5  # pause after an action; stabilization waits for the rest
     max_steps: int = 100  # total actions (screenshots) before stopping
     error_threshold: int = 5
     screenshot_resize_width: int = 0  # 0 = no resize, send full resolution
+    observe_last_tool_only: bool = False  # capture/parse once per tool batch, not per tool
+    foreground_check_interval: float = 5.0  # seconds between foreground app checks, 0 = every step
 
 
 class DeviceConfig(BaseModel):
     serial: Optional[str] = None
     adb_host: str = "127.0.0.1"
     adb_port: int = 5037
+    raw_screencap: bool = False  # uncompressed screencap: no on-device PNG encode, more bytes over adb
 
 
 class ConversationConfig(BaseModel):
-    max_images: int = 8  # max screenshots kept in context window
+    max_images: int = 8  # screenshots kept in context window (up to 4 more build up between trims)
     stabilization_timeout: float = 2.0  # max seconds to wait for screen to settle
     stabilization_interval: float = 0.3  # check interval during stabilization
+    max_image_dim: int = 1568  # downscale screenshots to this long edge before upload, 0 = full size
+    max_context_tokens: int = 150000  # estimated history size before oldest turns are dropped, 0 = unlimited
+    image_format: Literal["jpeg", "webp"] = "jpeg"  # upload format: webp is smaller, slower to encode
 
 
 class OmniParserConfig(BaseModel):
@@ -42,6 +51,12 @@ class OmniParserConfig(BaseModel):
     box_threshold: float = 0.05  # YOLO detection confidence threshold
     iou_threshold: float = 0.7  # NMS overlap threshold
     use_paddleocr: bool = False  # False = EasyOCR (safer on macOS)
+    cache_size: int = 32  # parse results kept by exact frame digest, 0 = disabled
+    inference_width: int = 0  # downscale to this width for detection, 0 = full resolution
+    half_precision: bool = True  # run YOLO detection in FP16 (CUDA and MPS)
+    quantize_caption: bool = False  # INT8 dynamic quantization of Florence-2 (CPU only)
+    tensorrt: bool = False  # run YOLO as a TensorRT engine, exported on first use (CUDA only)
+    ad_cutoff_ratio: float = 0.9  # drop elements centered below this fraction of height, 0 = keep all
 
 
 class AppConfig(BaseModel):
@@ -67,7 +82,7 @@ def load_config(config_path: Optional[str] = None) -> AppConfig:
 
     if path.exists():
         with open(path) as f:
-            config_data = yaml.safe_load(f) or {}
+            config_data = yaml.load(f, Loader=_YAMLLoader) or {}
 
     config = AppConfig(**config_data)
 
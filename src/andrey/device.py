@@ -1,6 +1,10 @@
 """ADB device manager for screenshots and input actions."""
 
+import functools
 import logging
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import adbutils
@@ -10,6 +14,18 @@ from andrey.models import ActionType, GameAction, ScreenInfo
 
 logger = logging.getLogger(__name__)
 
+# Package part of "com.example.game/.MainActivity" in dumpsys output
+_COMPONENT_PACKAGE_RE = re.compile(r"(\w+(?:\.\w+)+)/")
+
+# screencap raw pixel formats (android PixelFormat) with 4 bytes per pixel
+_RAW_RGBA_FORMATS = (1, 2)  # RGBA_8888, RGBX_8888
+
+
+@functools.lru_cache(maxsize=4)
+def _adb_client(host: str, port: int) -> adbutils.AdbClient:
+    """Shared AdbClient per adb server address."""
+    return adbutils.AdbClient(host=host, port=port)
+
 
 class DeviceError(Exception):
     """Raised when device operations fail."""
@@ -23,17 +39,19 @@ class DeviceManager:
         serial: Optional[str] = None,
         adb_host: str = "127.0.0.1",
         adb_port: int = 5037,
+        raw_screencap: bool = False,
     ):
         self._serial = serial
         self._adb_host = adb_host
         self._adb_port = adb_port
+        self._raw_screencap = raw_screencap
         self._device = None
         self._screen_info: Optional[ScreenInfo] = None
 
     def connect(self) -> None:
         """Connect to ADB device. Raises DeviceError if connection fails."""
         try:
-            client = adbutils.AdbClient(host=self._adb_host, port=self._adb_port)
+            client = _adb_client(self._adb_host, self._adb_port)
             devices = client.device_list()
 
             if not devices:
@@ -78,7 +96,12 @@ class DeviceManager:
             raise DeviceError("Not connected.")
 
         try:
-            img = self._device.screenshot()
+            if self._raw_screencap:
+                img = self._screencap_raw()
+            else:
+                img = self._device.screenshot()
+        except DeviceError:
+            raise
         except Exception as e:
             raise DeviceError(f"Screenshot capture failed: {e}")
 
@@ -90,73 +113,91 @@ class DeviceManager:
 
         return img
 
+    def _screencap_raw(self) -> Image.Image:
+        """Capture via `screencap` without -p, skipping on-device PNG encoding.
+
+        The output is a small header (width, height, format and, on Android
+        9+, a colorspace word) followed by 4-byte pixels.
+        """
+        data = self._device.shell(["screencap"], encoding=None)
+        if len(data) < 12:
+            raise DeviceError(f"Raw screencap returned {len(data)} bytes")
+
+        w, h, fmt = struct.unpack_from("<3I", data)
+        header = len(data) - w * h * 4
+        if fmt not in _RAW_RGBA_FORMATS or header not in (12, 16):
+            raise DeviceError(
+                f"Unsupported raw screencap output ({w}x{h}, format={fmt}, "
+                f"{len(data)} bytes); disable device.raw_screencap"
+            )
+        return Image.frombytes("RGB", (w, h), memoryview(data)[header:], "raw", "RGBX")
+
     def execute_action(self, action: GameAction) -> None:
         """Execute a validated game action on the device."""
         if not self._device:
             raise DeviceError("Not connected.")
 
         self._validate_coordinates(action)
+        self._ACTION_HANDLERS[action.action](self, action)
 
-        match action.action:
-            case ActionType.TAP:
-                logger.info(f"TAP ({action.x}, {action.y}) - {action.reasoning}")
-                self._device.click(action.x, action.y)
+    def _do_tap(self, action: GameAction) -> None:
+        logger.info(f"TAP ({action.x}, {action.y}) - {action.reasoning}")
+        self._device.click(action.x, action.y)
 
-            case ActionType.SWIPE:
-                duration = action.duration or 0.5
-                logger.info(
-                    f"SWIPE ({action.x},{action.y})->({action.x2},{action.y2}) "
-                    f"duration={duration}s - {action.reasoning}"
-                )
-                self._device.swipe(
-                    action.x, action.y, action.x2, action.y2, duration
-                )
+    def _do_swipe(self, action: GameAction) -> None:
+        duration = action.duration or 0.5
+        logger.info(
+            f"SWIPE ({action.x},{action.y})->({action.x2},{action.y2}) "
+            f"duration={duration}s - {action.reasoning}"
+        )
+        self._device.swipe(action.x, action.y, action.x2, action.y2, duration)
 
-            case ActionType.LONG_PRESS:
-                duration = action.duration or 1.0
-                logger.info(
-                    f"LONG_PRESS ({action.x}, {action.y}) {duration}s - {action.reasoning}"
-                )
-                self._device.swipe(
-                    action.x, action.y, action.x, action.y, duration
-                )
+    def _do_long_press(self, action: GameAction) -> None:
+        duration = action.duration or 1.0
+        logger.info(
+            f"LONG_PRESS ({action.x}, {action.y}) {duration}s - {action.reasoning}"
+        )
+        self._device.swipe(action.x, action.y, action.x, action.y, duration)
+
+    def _do_key(self, action: GameAction) -> None:
+        logger.info(f"KEY {action.key} - {action.reasoning}")
+        self._device.keyevent(action.key)
 
-            case ActionType.KEY:
-                logger.info(f"KEY {action.key} - {action.reasoning}")
-                self._device.keyevent(action.key)
+    def _do_type_text(self, action: GameAction) -> None:
+        logger.info(f"TYPE '{action.text}' - {action.reasoning}")
+        self._device.send_keys(action.text)
 
-            case ActionType.TYPE_TEXT:
-                logger.info(f"TYPE '{action.text}' - {action.reasoning}")
-                self._device.send_keys(action.text)
+    def _do_wait(self, action: GameAction) -> None:
+        logger.info(f"WAIT - {action.reasoning}")
 
-            case ActionType.WAIT:
-                logger.info(f"WAIT - {action.reasoning}")
+    def _do_game_over(self, action: GameAction) -> None:
+        logger.info(f"GAME_OVER detected - {action.reasoning}")
 
-            case ActionType.GAME_OVER:
-                logger.info(f"GAME_OVER detected - {action.reasoning}")
+    # ActionType -> handler, one entry per member
+    _ACTION_HANDLERS = {
+        ActionType.TAP: _do_tap,
+        ActionType.SWIPE: _do_swipe,
+        ActionType.LONG_PRESS: _do_long_press,
+        ActionType.KEY: _do_key,
+        ActionType.TYPE_TEXT: _do_type_text,
+        ActionType.WAIT: _do_wait,
+        ActionType.GAME_OVER: _do_game_over,
+    }
 
     def _validate_coordinates(self, action: GameAction) -> None:
         """Clamp coordinates to screen bounds with a warning."""
         si = self.screen_info
+        w, h = si.width, si.height
 
-        def clamp(val, max_val):
-            if val is None:
-                return None
+        for attr, max_val in (("x", w), ("y", h), ("x2", w), ("y2", h)):
+            val = getattr(action, attr)
+            if val is None or 0 <= val <= max_val:
+                continue
             clamped = max(0, min(val, max_val))
-            if clamped != val:
-                logger.warning(
-                    f"Coordinate {val} clamped to {clamped} (screen max: {max_val})"
-                )
-            return clamped
-
-        if action.x is not None:
-            action.x = clamp(action.x, si.width)
-        if action.y is not None:
-            action.y = clamp(action.y, si.height)
-        if action.x2 is not None:
-            action.x2 = clamp(action.x2, si.width)
-        if action.y2 is not None:
-            action.y2 = clamp(action.y2, si.height)
+            logger.warning(
+                f"Coordinate {val} clamped to {clamped} (screen max: {max_val})"
+            )
+            setattr(action, attr, clamped)
 
     def launch_app(self, package: str) -> None:
         """Launch an app by its package name using monkey."""
@@ -182,13 +223,8 @@ class DeviceManager:
                 "dumpsys activity activities | grep mResumedActivity"
             )
             # Output like: mResumedActivity: ActivityRecord{... com.youxi.spades/.MainActivity ...}
-            if "/" in output:
-                # Extract package name before the /
-                parts = output.split()
-                for part in parts:
-                    if "/" in part and "." in part:
-                        return part.split("/")[0].strip("{")
-            return None
+            match = _COMPONENT_PACKAGE_RE.search(output)
+            return match.group(1) if match else None
         except Exception:
             return None
 
@@ -212,5 +248,24 @@ class DeviceManager:
         adb_host: str = "127.0.0.1", adb_port: int = 5037
     ) -> list[str]:
         """List all connected device serials."""
-        client = adbutils.AdbClient(host=adb_host, port=adb_port)
+        client = _adb_client(adb_host, adb_port)
         return [d.serial for d in client.device_list()]
+
+    @staticmethod
+    def ping_devices(
+        serials: list[str], adb_host: str = "127.0.0.1", adb_port: int = 5037
+    ) -> dict[str, bool]:
+        """Check which devices respond to a shell command, probing in parallel."""
+        if not serials:
+            return {}
+        client = _adb_client(adb_host, adb_port)
+
+        def ping(serial: str) -> bool:
+            try:
+                client.device(serial=serial).shell("echo ping", timeout=10)
+                return True
+            except Exception:
+                return False
+
+        with ThreadPoolExecutor(max_workers=min(32, len(serials))) as pool:
+            return dict(zip(serials, pool.map(ping, serials)))
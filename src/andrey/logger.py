@@ -1,6 +1,9 @@
 """Colored terminal logging setup with optional file logging."""
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from typing import Optional
@@ -17,9 +20,22 @@ class ColorFormatter(logging.Formatter):
     }
     RESET = "\033[0m"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Colored, padded level labels, built once instead of per record
+        self._labels = {
+            level: f"{color}{logging.getLevelName(level):<7}{self.RESET}"
+            for level, color in self.COLORS.items()
+        }
+
     def format(self, record):
-        color = self.COLORS.get(record.levelno, "")
-        record.levelname = f"{color}{record.levelname:<7}{self.RESET}"
+        label = self._labels.get(record.levelno)
+        if label is None:
+            label = f"{record.levelname:<7}{self.RESET}"
+        # Color a copy: the record is shared with the file handler, which
+        # must see the plain level name.
+        record = logging.makeLogRecord(record.__dict__)
+        record.levelname = label
         return super().format(record)
 
 
@@ -32,6 +48,9 @@ def setup_logging(
         verbose: If True, set log level to DEBUG for stderr.
         log_dir: If provided, write a session.log file in this directory
             at DEBUG level (captures all messages regardless of verbose flag).
+            Records are handed to a background thread, which buffers them
+            and writes in batches of 256, or immediately on ERROR; the
+            queue is drained and the buffer flushed at exit.
     """
     level = logging.DEBUG if verbose else logging.INFO
 
@@ -49,7 +68,8 @@ def setup_logging(
     )
     root.addHandler(stderr_handler)
 
-    # File handler (always DEBUG, plain text)
+    # File handler (always DEBUG, plain text), buffered to batch writes and
+    # fed through a queue so disk I/O stays off the calling thread
     if log_dir:
         log_path = Path(log_dir)
         log_path.mkdir(parents=True, exist_ok=True)
@@ -63,7 +83,15 @@ def setup_logging(
                 datefmt="%H:%M:%S",
             )
         )
-        root.addHandler(file_handler)
+        buffer_handler = logging.handlers.MemoryHandler(
+            capacity=256, flushLevel=logging.ERROR, target=file_handler
+        )
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, buffer_handler)
+        listener.start()
+        # Runs before logging's own exit hook, which then flushes the buffer
+        atexit.register(listener.stop)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
 
     # Suppress noisy library loggers
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -1,5 +1,6 @@
 """Data models for actions, responses, and device info."""
 
+from dataclasses import dataclass
 from enum import Enum
 from typing import Any, Optional
 
@@ -38,7 +39,8 @@ class GameAction(BaseModel):
         return v
 
 
-class ActionRecord(BaseModel):
+@dataclass(slots=True)
+class ActionRecord:
     """Recorded action for history tracking."""
 
     iteration: int
@@ -48,7 +50,8 @@ class ActionRecord(BaseModel):
     llm_latency_ms: float = 0.0
 
 
-class ScreenInfo(BaseModel):
+@dataclass(slots=True)
+class ScreenInfo:
     """Device screen metadata."""
 
     width: int
@@ -69,7 +72,8 @@ class ToolCall(BaseModel):
     reasoning: str = ""
 
 
-class ToolResult(BaseModel):
+@dataclass(slots=True)
+class ToolResult:
     """Result of executing a tool call on the device."""
 
     tool_use_id: str
@@ -77,9 +81,6 @@ class ToolResult(BaseModel):
     should_stop: bool = False
     is_error: bool = False
 
-    class Config:
-        arbitrary_types_allowed = True
-
 
 class ApiResponse(BaseModel):
     """Parsed response from a Claude API call."""
@@ -1,9 +1,11 @@
 """OmniParser wrapper for UI element detection from screenshots."""
 
+import base64
 import logging
 import sys
 import time
 from dataclasses import dataclass, field
+from io import BytesIO
 from pathlib import Path
 from typing import Optional
 
@@ -12,22 +14,17 @@ from PIL import Image
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class UIElement:
     """A detected UI element with bounding box and description."""
 
     id: int
     type: str  # "text" or "icon"
     content: str  # text content or icon description
-    bbox: list[float]  # [x1, y1, x2, y2] in pixels
+    bbox: tuple[float, float, float, float]  # (x1, y1, x2, y2) in pixels
     interactive: bool
-    center_x: int = 0
-    center_y: int = 0
-
-    def __post_init__(self):
-        if self.bbox and len(self.bbox) == 4:
-            self.center_x = int((self.bbox[0] + self.bbox[2]) / 2)
-            self.center_y = int((self.bbox[1] + self.bbox[3]) / 2)
+    center_x: int  # computed with the bbox during detection
+    center_y: int
 
 
 @dataclass
@@ -54,6 +51,11 @@ class OmniParserClient:
         box_threshold: float = 0.05,
         iou_threshold: float = 0.7,
         use_paddleocr: bool = False,
+        inference_width: int = 0,
+        half_precision: bool = True,
+        quantize_caption: bool = False,
+        tensorrt: bool = False,
+        ad_cutoff_ratio: float = 0.9,
     ):
         self._omniparser_path = omniparser_path
         self._weights_path = weights_path
@@ -61,6 +63,11 @@ class OmniParserClient:
         self._box_threshold = box_threshold
         self._iou_threshold = iou_threshold
         self._use_paddleocr = use_paddleocr
+        self._inference_width = inference_width  # 0 = full resolution
+        self._half_precision = half_precision  # FP16 YOLO on CUDA/MPS
+        self._quantize_caption = quantize_caption  # INT8 Florence-2 on CPU
+        self._tensorrt = tensorrt  # TensorRT YOLO engine on CUDA
+        self._ad_cutoff_ratio = ad_cutoff_ratio  # drop elements below this, 0 = keep all
         self._som_model = None
         self._caption_model_processor = None
         self._loaded = False
@@ -163,8 +170,18 @@ class OmniParserClient:
 
             # Load YOLO detection model
             detect_path = str(weights_dir / "icon_detect" / "model.pt")
-            self._som_model = get_yolo_model(model_path=detect_path)
-            self._som_model.to(self._device)
+            engine_path = self._tensorrt_engine(detect_path)
+            if engine_path:
+                # Engines are bound to the GPU and precision they were built for
+                self._som_model = get_yolo_model(model_path=engine_path)
+            else:
+                self._som_model = get_yolo_model(model_path=detect_path)
+                self._som_model.to(self._device)
+                # OmniParser calls model.predict() without precision args;
+                # ultralytics merges overrides into every predict call.
+                # Only YOLO goes FP16 on MPS; Florence-2 stays FP32 there.
+                if self._half_precision and self._device in ("cuda", "mps"):
+                    self._som_model.overrides["half"] = True
 
             # Load Florence-2 caption model
             caption_path = weights_dir / "icon_caption_florence"
@@ -195,6 +212,24 @@ class OmniParserClient:
             if self._device == "mps":
                 self._caption_model_processor["model"] = model.to(self._device)
 
+            # Dynamic INT8 quantization of the Linear layers; the quantized
+            # kernels only exist on CPU.
+            if self._quantize_caption:
+                if self._device == "cpu":
+                    import torch
+
+                    self._caption_model_processor["model"] = (
+                        torch.ao.quantization.quantize_dynamic(
+                            model, {torch.nn.Linear}, dtype=torch.qint8
+                        )
+                    )
+                    logger.info("Florence-2 caption model quantized to INT8")
+                else:
+                    logger.warning(
+                        f"quantize_caption is only supported on cpu, "
+                        f"ignoring on {self._device}"
+                    )
+
             elapsed = (time.monotonic() - t0) * 1000
             logger.info(f"OmniParser models loaded in {elapsed:.0f}ms")
             self._loaded = True
@@ -205,19 +240,65 @@ class OmniParserClient:
             self._available = False
             return False
 
+    def _tensorrt_engine(self, detect_path: str) -> Optional[str]:
+        """Return a TensorRT engine for the YOLO weights, exporting it if needed.
+
+        The engine is cached next to model.pt as model.fp16.engine or
+        model.fp32.engine, so changing half_precision builds a new one.
+        Returns None when TensorRT is disabled, not on CUDA, or the export
+        fails (PyTorch is used instead).
+        """
+        if not self._tensorrt:
+            return None
+        if self._device != "cuda":
+            logger.warning(
+                f"tensorrt is only supported on cuda, ignoring on {self._device}"
+            )
+            return None
+
+        precision = "fp16" if self._half_precision else "fp32"
+        engine_path = Path(detect_path).with_suffix(f".{precision}.engine")
+        if engine_path.exists():
+            return str(engine_path)
+
+        try:
+            from ultralytics import YOLO
+
+            logger.info("Exporting YOLO to TensorRT (one-time, may take minutes)...")
+            exported = YOLO(detect_path).export(
+                format="engine", half=self._half_precision, device=0
+            )
+            # ultralytics always writes model.engine
+            Path(exported).replace(engine_path)
+            return str(engine_path)
+        except Exception as e:
+            logger.warning(f"TensorRT export failed, using PyTorch: {e}")
+            return None
+
     def parse(self, image: Image.Image) -> ParseResult:
         """Parse a screenshot to detect UI elements.
 
         Returns ParseResult with annotated image and element list.
         Falls back to raw image with empty elements if OmniParser unavailable.
+
+        If inference_width is set, detection runs on a downscaled copy; element
+        boxes are still reported in full-resolution pixels, while the annotated
+        image stays at the reduced size.
         """
         if not self._load_models():
             return ParseResult(annotated_image=image, elements=[], latency_ms=0.0)
 
         t0 = time.monotonic()
 
+        infer_image = image
+        if self._inference_width and image.width > self._inference_width:
+            ratio = self._inference_width / image.width
+            infer_image = image.resize(
+                (self._inference_width, int(image.height * ratio)), Image.LANCZOS
+            )
+
         try:
-            result = self._run_detection(image)
+            result = self._run_detection(infer_image, image.size)
             result.latency_ms = (time.monotonic() - t0) * 1000
             logger.info(
                 f"OmniParser: {len(result.elements)} elements detected "
@@ -232,11 +313,19 @@ class OmniParserClient:
                 latency_ms=(time.monotonic() - t0) * 1000,
             )
 
-    def _run_detection(self, image: Image.Image) -> ParseResult:
-        """Run the full OmniParser pipeline on an image."""
+    def _run_detection(
+        self, image: Image.Image, output_size: Optional[tuple[int, int]] = None
+    ) -> ParseResult:
+        """Run the full OmniParser pipeline on an image.
+
+        Args:
+            image: Image to run detection on.
+            output_size: (width, height) to express element boxes in, if the
+                image was downscaled for inference. Defaults to image.size.
+        """
         from util.utils import check_ocr_box, get_som_labeled_img
 
-        w, h = image.size
+        w, h = output_size or image.size
 
         # Step 1: Run OCR (check_ocr_box accepts PIL Image directly)
         ocr_bbox_rslt, _ = check_ocr_box(
@@ -279,34 +368,43 @@ class OmniParserClient:
         )
 
         # Decode annotated image from base64
-        import base64
-        from io import BytesIO
-
         annotated_image = Image.open(
             BytesIO(base64.b64decode(dino_labeled_img_b64))
         )
 
         # Convert parsed content to UIElement list
-        # Bounding boxes in parsed_content_list are always in ratio format (0-1)
-        elements = []
-        for idx, item in enumerate(parsed_content_list):
-            bbox_ratio = item.get("bbox", [0, 0, 0, 0])
-            # Convert ratio coords to pixel coords
-            bbox_px = [
-                bbox_ratio[0] * w,
-                bbox_ratio[1] * h,
-                bbox_ratio[2] * w,
-                bbox_ratio[3] * h,
-            ]
-            elements.append(
-                UIElement(
-                    id=idx,
-                    type=item.get("type", "unknown"),
-                    content=item.get("content", "") or "",
-                    bbox=[float(c) for c in bbox_px],
-                    interactive=item.get("interactivity", False),
-                )
+        # Bounding boxes in parsed_content_list are always in ratio format (0-1);
+        # scale them and compute centers for all elements at once.
+        import numpy as np
+
+        ratios = np.array(
+            [item.get("bbox", [0, 0, 0, 0]) for item in parsed_content_list],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+        bboxes_px = ratios * np.array([w, h, w, h], dtype=np.float64)
+        centers = ((bboxes_px[:, :2] + bboxes_px[:, 2:]) / 2).astype(np.int64)
+
+        # Drop elements centered in the ad banner zone at the bottom. IDs keep
+        # their original index, since that is the number drawn on the image.
+        ids = np.arange(len(parsed_content_list))
+        if self._ad_cutoff_ratio > 0:
+            keep = centers[:, 1] <= int(h * self._ad_cutoff_ratio)
+            ids, bboxes_px, centers = ids[keep], bboxes_px[keep], centers[keep]
+
+        elements = [
+            UIElement(
+                id=idx,
+                type=parsed_content_list[idx].get("type", "unknown"),
+                content=parsed_content_list[idx].get("content", "") or "",
+                bbox=tuple(bbox),
+                interactive=parsed_content_list[idx].get("interactivity", False),
+                center_x=cx,
+                center_y=cy,
+            )
+            for idx, bbox, (cx, cy) in zip(
+                ids.tolist(), bboxes_px.tolist(), centers.tolist()
             )
+        ]
 
         return ParseResult(
             annotated_image=annotated_image,
@@ -314,29 +412,19 @@ class OmniParserClient:
         )
 
     @staticmethod
-    def format_elements_text(
-        elements: list[UIElement], screen_height: int = 0
-    ) -> str:
+    def format_elements_text(elements: list[UIElement]) -> str:
         """Format element list as text for Claude.
 
-        Args:
-            elements: Detected UI elements.
-            screen_height: If >0, elements in the bottom 10% are filtered
-                out (typically ad banners).
+        Ad-banner elements are already dropped during detection.
         """
         if not elements:
             return "No UI elements detected. Use tap(x, y) with estimated coordinates."
 
-        ad_cutoff = int(screen_height * 0.9) if screen_height > 0 else 0
-
         lines = ["Detected UI elements (use tap_element with the element ID):"]
         for el in elements:
-            # Skip elements in the ad banner zone
-            if ad_cutoff and el.center_y > ad_cutoff:
-                continue
             interactive_str = " [INTERACTIVE]" if el.interactive else ""
-            w = int(el.bbox[2] - el.bbox[0]) if len(el.bbox) == 4 else 0
-            h = int(el.bbox[3] - el.bbox[1]) if len(el.bbox) == 4 else 0
+            w = int(el.bbox[2] - el.bbox[0])
+            h = int(el.bbox[3] - el.bbox[1])
             lines.append(
                 f"  [{el.id}] {el.type}: \"{el.content}\" "
                 f"at ({el.center_x}, {el.center_y}) "
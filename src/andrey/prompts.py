@@ -4,6 +4,7 @@ from pathlib import Path
 
 import yaml
 
+from andrey.config import _YAMLLoader
 from andrey.models import ScreenInfo
 
 
@@ -24,7 +25,7 @@ def load_game_profile(profile_name: str) -> dict:
         )
 
     with open(profile_path) as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YAMLLoader)
 
 
 def build_system_prompt(
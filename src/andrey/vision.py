@@ -1,10 +1,12 @@
 """Claude vision API clients for screenshot analysis."""
 
-import base64
+import binascii
 import io
 import logging
 import time
-from typing import Optional
+import weakref
+from collections import OrderedDict, deque
+from typing import Callable, Optional
 
 import anthropic
 from PIL import Image
@@ -13,6 +15,41 @@ from andrey.models import ApiResponse, ToolCall
 
 logger = logging.getLogger(__name__)
 
+# Response block type -> plain dict, read straight off the attributes.
+# Other block types fall back to model_dump().
+_BLOCK_DUMPERS: dict[str, Callable] = {
+    "text": lambda b: {"type": "text", "text": b.text},
+    "tool_use": lambda b: {
+        "type": "tool_use",
+        "id": b.id,
+        "name": b.name,
+        "input": dict(b.input),
+    },
+}
+
+
+def _keep_block(block: dict) -> dict:
+    return block
+
+
+def _strip_tool_result_images(block: dict) -> dict:
+    return {
+        **block,
+        "content": [
+            {"type": "text", "text": "[Screenshot removed]"}
+            if inner.get("type") == "image"
+            else inner
+            for inner in block["content"]
+        ],
+    }
+
+
+# Block type -> copy of the block with its images replaced by placeholders
+_IMAGE_STRIPPERS: dict[str, Callable] = {
+    "image": lambda b: {"type": "text", "text": "[Screenshot removed to save context]"},
+    "tool_result": _strip_tool_result_images,
+}
+
 
 class VisionError(Exception):
     """Raised when vision API calls fail."""
@@ -32,22 +69,35 @@ class VisionClient:
         self._model = model
         self._max_tokens = max_tokens
         self._temperature = temperature
+        self._encode_buffer = io.BytesIO()  # reused across encode_image calls
 
     def encode_image(
         self, image: Image.Image, fmt: str = "JPEG", quality: int = 85
     ) -> tuple[str, str]:
         """Encode PIL Image to base64. Returns (base64_data, media_type)."""
-        buffer = io.BytesIO()
+        buffer = self._encode_buffer
+        buffer.seek(0)
+        buffer.truncate()
         if fmt.upper() == "JPEG":
             if image.mode == "RGBA":
                 image = image.convert("RGB")
             image.save(buffer, format="JPEG", quality=quality)
             media_type = "image/jpeg"
-        else:
+        elif fmt.upper() == "WEBP":
+            # method=2 keeps most of the size win at a fraction of the
+            # default effort level's encode time
+            image.save(buffer, format="WEBP", quality=quality, method=2)
+            media_type = "image/webp"
+        elif fmt.upper() == "PNG":
             image.save(buffer, format="PNG")
             media_type = "image/png"
+        else:
+            raise ValueError(f"Unsupported image format: {fmt!r}")
 
-        base64_data = base64.standard_b64encode(buffer.getvalue()).decode("utf-8")
+        # Encode straight from the buffer; the view must be released before
+        # the next call truncates it.
+        with buffer.getbuffer() as view:
+            base64_data = binascii.b2a_base64(view, newline=False).decode("ascii")
         logger.debug(
             f"Encoded image: {image.size[0]}x{image.size[1]}, "
             f"format={fmt}, base64 size={len(base64_data)} chars"
@@ -93,6 +143,22 @@ class ConversationClient:
     screenshots. This enables multi-step UI flows.
     """
 
+    _ENCODE_CACHE_SIZE = 16
+
+    # Fixed text around the element list in send_screenshot
+    _SCREENSHOT_PREFIX = "Here is the current screenshot."
+    _SCREENSHOT_SUFFIX = "\n\nDecide what action to take."
+
+    # Rough input-token estimates for the context budget: text at ~4
+    # characters per token, images at the cost of a 1568px screenshot.
+    _CHARS_PER_TOKEN = 4
+    _IMAGE_TOKENS = 1600
+
+    # Images allowed beyond max_images before a trim. Stripping an image
+    # rewrites an early message and invalidates the cached prefix, so the
+    # window is trimmed back in one go every few turns, not every turn.
+    _IMAGE_TRIM_SLACK = 4
+
     def __init__(
         self,
         api_key: str,
@@ -101,6 +167,9 @@ class ConversationClient:
         tools: list[dict] = None,
         system_prompt: str = "",
         max_images: int = 8,
+        max_image_dim: int = 1568,
+        max_context_tokens: int = 150_000,
+        image_format: str = "JPEG",
     ):
         self._client = anthropic.Anthropic(api_key=api_key)
         self._model = model
@@ -108,10 +177,26 @@ class ConversationClient:
         self._tools = tools or []
         self._system_prompt = system_prompt
         self._messages: list[dict] = []
+        self._message_tokens: list[int] = []  # estimated tokens, parallel to _messages
+        self._image_messages: deque[int] = deque()  # indices of messages with images, oldest first
         self._max_images = max_images
+        self._max_context_tokens = max_context_tokens  # 0 = no budget
+        # System prompt and tool schemas are sent with every request
+        self._fixed_tokens = (
+            len(system_prompt) + len(str(self._tools))
+        ) // self._CHARS_PER_TOKEN
+        self._max_image_dim = max_image_dim  # 0 = send full resolution
+        self._image_format = image_format.upper()  # JPEG or WEBP
+        if self._image_format not in ("JPEG", "WEBP"):
+            raise ValueError(f"Unsupported image format: {image_format!r}")
+        self._encode_buffer = io.BytesIO()  # reused across _encode_image calls
+        # (id(image), fmt, quality) -> (weakref to image, encoding), LRU
+        self._encode_cache: OrderedDict[tuple, tuple] = OrderedDict()
+        self._last_uploaded_hash: Optional[bytes] = None  # exact digest of newest image sent
         self._turn_count = 0
         self._total_input_tokens = 0
         self._total_output_tokens = 0
+        self._total_cache_read_tokens = 0
 
     @property
     def turn_count(self) -> int:
@@ -125,16 +210,25 @@ class ConversationClient:
     def total_output_tokens(self) -> int:
         return self._total_output_tokens
 
+    @property
+    def total_cache_read_tokens(self) -> int:
+        return self._total_cache_read_tokens
+
     def send_screenshot(
-        self, image: Image.Image, elements_text: str = ""
+        self,
+        image: Image.Image,
+        elements_text: str = "",
+        image_hash: Optional[bytes] = None,
     ) -> ApiResponse:
         """Send a screenshot as a user message and get Claude's response.
 
         Args:
             image: The annotated screenshot (with OmniParser bounding boxes if available)
             elements_text: Text list of detected UI elements
+            image_hash: Exact digest of the underlying screen, used to avoid re-sending it
         """
         base64_data, media_type = self._encode_image(image)
+        self._last_uploaded_hash = image_hash
 
         user_content = [
             {
@@ -147,14 +241,16 @@ class ConversationClient:
             },
         ]
 
-        text_msg = "Here is the current screenshot."
         if elements_text:
-            text_msg += f"\n\n{elements_text}"
-        text_msg += "\n\nDecide what action to take."
+            text_msg = (
+                f"{self._SCREENSHOT_PREFIX}\n\n{elements_text}{self._SCREENSHOT_SUFFIX}"
+            )
+        else:
+            text_msg = self._SCREENSHOT_PREFIX + self._SCREENSHOT_SUFFIX
 
         user_content.append({"type": "text", "text": text_msg})
 
-        self._messages.append({"role": "user", "content": user_content})
+        self._append_message({"role": "user", "content": user_content}, has_image=True)
         self._turn_count += 1
 
         return self._call_api()
@@ -170,16 +266,34 @@ class ConversationClient:
                 - tool_use_id: str
                 - text_result: str
                 - image: Optional[Image.Image] (result screenshot)
+                - image_hash: Optional[bytes] (exact digest of the screen behind image)
                 - elements_text: Optional[str] (detected elements in result)
                 - is_error: bool
+
+        A result image whose image_hash matches the last image sent is
+        omitted; Claude is told the screen is unchanged instead.
         """
         tool_result_blocks = []
+        has_image = False
 
         for result in results:
             content = []
+            text = result.get("text_result", "Action executed.")
 
             # Add result screenshot if provided
-            if result.get("image"):
+            image_hash = result.get("image_hash")
+            if (
+                result.get("image")
+                and image_hash is not None
+                and image_hash == self._last_uploaded_hash
+            ):
+                text += (
+                    " (The screen is identical to the last screenshot you "
+                    "received, so it is not sent again.)"
+                )
+            elif result.get("image"):
+                self._last_uploaded_hash = image_hash
+                has_image = True
                 b64, media = self._encode_image(result["image"])
                 content.append(
                     {
@@ -193,7 +307,6 @@ class ConversationClient:
                 )
 
             # Build text result
-            text = result.get("text_result", "Action executed.")
             if result.get("elements_text"):
                 text += f"\n\n{result['elements_text']}"
             content.append({"type": "text", "text": text})
@@ -207,7 +320,9 @@ class ConversationClient:
                 }
             )
 
-        self._messages.append({"role": "user", "content": tool_result_blocks})
+        self._append_message(
+            {"role": "user", "content": tool_result_blocks}, has_image=has_image
+        )
         self._turn_count += 1
 
         return self._call_api()
@@ -215,10 +330,13 @@ class ConversationClient:
     def reset(self, summary: Optional[str] = None) -> None:
         """Reset the conversation, optionally with a game state summary."""
         self._messages.clear()
+        self._message_tokens.clear()
+        self._image_messages.clear()
         self._turn_count = 0
+        self._last_uploaded_hash = None
 
         if summary:
-            self._messages.append(
+            self._append_message(
                 {
                     "role": "user",
                     "content": [
@@ -230,7 +348,7 @@ class ConversationClient:
                 }
             )
             # Need a placeholder assistant response to maintain alternation
-            self._messages.append(
+            self._append_message(
                 {
                     "role": "assistant",
                     "content": [
@@ -255,18 +373,23 @@ class ConversationClient:
                 model=self._model,
                 max_tokens=self._max_tokens,
                 temperature=0.0,
-                system=self._system_prompt,
-                messages=self._messages,
+                system=self._cached_system(),
+                messages=self._cached_messages(),
                 tools=self._tools,
             )
 
             elapsed_ms = (time.monotonic() - t0) * 1000
-            self._total_input_tokens += response.usage.input_tokens
-            self._total_output_tokens += response.usage.output_tokens
+            usage = response.usage
+            cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+            cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+            self._total_input_tokens += usage.input_tokens
+            self._total_output_tokens += usage.output_tokens
+            self._total_cache_read_tokens += cache_read
 
             logger.info(
                 f"API response in {elapsed_ms:.0f}ms "
-                f"(in={response.usage.input_tokens}, out={response.usage.output_tokens}, "
+                f"(in={usage.input_tokens}, out={usage.output_tokens}, "
+                f"cache_read={cache_read}, cache_write={cache_write}, "
                 f"stop={response.stop_reason})"
             )
 
@@ -275,24 +398,16 @@ class ConversationClient:
             # serialization issues when passing back to the API.
             content_dicts = []
             for block in response.content:
-                if block.type == "text":
-                    content_dicts.append({"type": "text", "text": block.text})
-                elif block.type == "tool_use":
-                    content_dicts.append({
-                        "type": "tool_use",
-                        "id": block.id,
-                        "name": block.name,
-                        "input": dict(block.input),
-                    })
-                else:
-                    content_dicts.append(block.model_dump())
-            self._messages.append(
-                {"role": "assistant", "content": content_dicts}
-            )
+                dumper = _BLOCK_DUMPERS.get(block.type)
+                content_dicts.append(
+                    dumper(block) if dumper else block.model_dump(mode="python")
+                )
+            self._append_message({"role": "assistant", "content": content_dicts})
 
-            return self._parse_response(response)
+            return self._parse_response(response, content_dicts)
 
         except anthropic.RateLimitError as e:
+            self._discard_unanswered_message()
             raise VisionError(f"Rate limited: {e}")
         except anthropic.APIError as e:
             # Check for context overflow
@@ -300,25 +415,59 @@ class ConversationClient:
                 logger.warning(f"Context overflow detected: {e}. Resetting conversation.")
                 self.reset()
                 raise VisionError(f"Context overflow, conversation reset: {e}")
+            self._discard_unanswered_message()
             raise VisionError(f"API error: {e}")
 
-    def _parse_response(self, response) -> ApiResponse:
-        """Extract tool calls and text from the API response."""
+    def _cached_system(self):
+        """System prompt as a block marked as a prompt-cache breakpoint."""
+        if not self._system_prompt:
+            return self._system_prompt
+        return [
+            {
+                "type": "text",
+                "text": self._system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+
+    def _cached_messages(self) -> list[dict]:
+        """Messages with a prompt-cache breakpoint on the newest block.
+
+        Marking the end of the history lets the next turn read everything
+        up to here from cache. The marker goes on copies, so the stored
+        history stays free of stale breakpoints.
+        """
+        if not self._messages:
+            return self._messages
+        last = self._messages[-1]
+        content = last.get("content")
+        if not isinstance(content, list) or not content:
+            return self._messages
+        marked = {**content[-1], "cache_control": {"type": "ephemeral"}}
+        return self._messages[:-1] + [{**last, "content": content[:-1] + [marked]}]
+
+    def _parse_response(self, response, content: list[dict]) -> ApiResponse:
+        """Extract tool calls and text from the API response.
+
+        Reads the plain-dict content already built for the history rather
+        than the SDK blocks, so each tool input is copied only once.
+        """
         tool_calls = []
         text_parts = []
 
-        for block in response.content:
-            if block.type == "tool_use":
+        for block in content:
+            if block["type"] == "tool_use":
+                tool_input = block["input"]
                 tool_calls.append(
                     ToolCall(
-                        tool_use_id=block.id,
-                        tool_name=block.name,
-                        tool_input=dict(block.input),
-                        reasoning=block.input.get("reasoning", ""),
+                        tool_use_id=block["id"],
+                        tool_name=block["name"],
+                        tool_input=tool_input,
+                        reasoning=tool_input.get("reasoning", ""),
                     )
                 )
-            elif block.type == "text":
-                text_parts.append(block.text)
+            elif block["type"] == "text":
+                text_parts.append(block["text"])
 
         return ApiResponse(
             stop_reason=response.stop_reason,
@@ -329,86 +478,192 @@ class ConversationClient:
         )
 
     def _trim_conversation(self) -> None:
-        """Manage context window by removing old images from conversation."""
-        if len(self._messages) <= 4:
-            return
+        """Manage context window by removing old images from conversation.
 
-        # Count messages with images
-        image_indices = []
-        for i, msg in enumerate(self._messages):
-            if self._message_has_image(msg):
-                image_indices.append(i)
-
-        # Strip images from oldest messages to stay under limit
-        while len(image_indices) > self._max_images:
-            oldest_idx = image_indices.pop(0)
-            self._strip_images(self._messages[oldest_idx])
-            logger.debug(f"Stripped images from message {oldest_idx}")
-
-    def _message_has_image(self, message: dict) -> bool:
-        """Check if a message contains image content."""
-        content = message.get("content", [])
-        if isinstance(content, list):
-            for block in content:
-                if isinstance(block, dict):
-                    if block.get("type") == "image":
-                        return True
-                    # Check inside tool_result blocks
-                    if block.get("type") == "tool_result":
-                        inner = block.get("content", [])
-                        if isinstance(inner, list):
-                            for inner_block in inner:
-                                if isinstance(inner_block, dict) and inner_block.get("type") == "image":
-                                    return True
-        return False
+        Messages are only ever appended (or cleared on reset), so the
+        indices recorded when image-bearing messages were added stay valid
+        and the history never has to be rescanned. Images are stripped
+        only once max_images is exceeded by _IMAGE_TRIM_SLACK, and then
+        back down to max_images, so the cached prefix survives in between.
+        """
+        if len(self._image_messages) > self._max_images + self._IMAGE_TRIM_SLACK:
+            while len(self._image_messages) > self._max_images:
+                oldest_idx = self._image_messages.popleft()
+                self._strip_images(self._messages[oldest_idx])
+                self._message_tokens[oldest_idx] = self._estimate_tokens(
+                    self._messages[oldest_idx]
+                )
+                logger.debug(f"Stripped images from message {oldest_idx}")
+                if not self._image_messages:
+                    # The last uploaded frame is gone from context
+                    self._last_uploaded_hash = None
+
+        if self._max_context_tokens:
+            self._drop_oldest_turns()
+
+    def _append_message(self, message: dict, has_image: bool = False) -> None:
+        """Append a message, recording its token estimate and image index."""
+        self._messages.append(message)
+        self._message_tokens.append(self._estimate_tokens(message))
+        if has_image:
+            self._image_messages.append(len(self._messages) - 1)
+
+    def _discard_unanswered_message(self) -> None:
+        """Remove the user message a failed request left without a reply.
+
+        The agent retries by submitting its results again, so keeping it
+        would put two user messages, with the same tool_results, in a row.
+        """
+        if not self._messages or self._messages[-1]["role"] != "user":
+            return
+        self._messages.pop()
+        self._message_tokens.pop()
+        if self._image_messages and self._image_messages[-1] == len(self._messages):
+            self._image_messages.pop()
+            # Claude never received that image
+            self._last_uploaded_hash = None
+
+    def _estimate_tokens(self, message: dict) -> int:
+        """Rough token count of a message or tool_result block."""
+        tokens = 0
+        for block in message.get("content", []):
+            block_type = block.get("type")
+            if block_type == "image":
+                tokens += self._IMAGE_TOKENS
+            elif block_type == "tool_result":
+                tokens += self._estimate_tokens(block)
+            elif block_type == "tool_use":
+                tokens += len(str(block.get("input", ""))) // self._CHARS_PER_TOKEN
+            else:
+                tokens += len(block.get("text", "")) // self._CHARS_PER_TOKEN
+        return tokens
+
+    def _drop_oldest_turns(self) -> None:
+        """Drop the oldest turns once the history exceeds the token budget.
+
+        Text keeps accumulating after images are stripped, and running into
+        the model's context limit forces a full reset. Once over budget,
+        history is cut back to three quarters of it in one go, so the cut
+        (which invalidates the prompt cache) happens rarely. The cut is made
+        just before an assistant message and replaced by a user placeholder,
+        so roles keep alternating and every tool_result still follows the
+        tool_use it answers. The newest exchange is always kept.
+        """
+        budget = self._max_context_tokens - self._fixed_tokens
+        total = sum(self._message_tokens)
+        if total <= budget:
+            return
 
-    def _strip_images(self, message: dict) -> None:
-        """Replace image blocks with text placeholders."""
-        content = message.get("content", [])
-        if not isinstance(content, list):
+        placeholder = {
+            "role": "user",
+            "content": [{"type": "text", "text": "[Earlier turns omitted to save context]"}],
+        }
+        placeholder_tokens = self._estimate_tokens(placeholder)
+        target = budget * 3 // 4
+
+        # Find the earliest assistant message that gets under the target,
+        # or else the newest one before the final user message. Roles are
+        # checked rather than assumed to alternate.
+        cut = cut_dropped = 0
+        dropped = 0
+        for index in range(1, len(self._messages) - 1):
+            dropped += self._message_tokens[index - 1]
+            if self._messages[index]["role"] != "assistant":
+                continue
+            cut, cut_dropped = index, dropped
+            if total - dropped + placeholder_tokens <= target:
+                break
+        if not cut:
             return
+        dropped = cut_dropped
+
+        del self._messages[:cut]
+        del self._message_tokens[:cut]
+        self._messages.insert(0, placeholder)
+        self._message_tokens.insert(0, placeholder_tokens)
+        shift = cut - 1
+        self._image_messages = deque(
+            i - shift for i in self._image_messages if i >= cut
+        )
+        if not self._image_messages:
+            # The last uploaded frame was in the dropped turns
+            self._last_uploaded_hash = None
+        logger.info(
+            f"Dropped {cut} oldest messages to stay under the context budget "
+            f"(~{total} -> ~{total - dropped + placeholder_tokens} tokens)"
+        )
 
-        new_content = []
-        for block in content:
-            if isinstance(block, dict):
-                if block.get("type") == "image":
-                    new_content.append(
-                        {"type": "text", "text": "[Screenshot removed to save context]"}
-                    )
-                elif block.get("type") == "tool_result":
-                    # Strip images inside tool_result blocks
-                    inner = block.get("content", [])
-                    if isinstance(inner, list):
-                        new_inner = []
-                        for inner_block in inner:
-                            if isinstance(inner_block, dict) and inner_block.get("type") == "image":
-                                new_inner.append(
-                                    {"type": "text", "text": "[Screenshot removed]"}
-                                )
-                            else:
-                                new_inner.append(inner_block)
-                        block = {**block, "content": new_inner}
-                    new_content.append(block)
-                else:
-                    new_content.append(block)
-            else:
-                new_content.append(block)
+    def _strip_images(self, message: dict) -> None:
+        """Replace image blocks with text placeholders.
 
-        message["content"] = new_content
+        Only called for messages recorded as holding images, whose content
+        is always a list of block dicts built by this class.
+        """
+        message["content"] = [
+            _IMAGE_STRIPPERS.get(block.get("type"), _keep_block)(block)
+            for block in message["content"]
+        ]
 
-    @staticmethod
     def _encode_image(
-        image: Image.Image, fmt: str = "JPEG", quality: int = 85
+        self, image: Image.Image, fmt: Optional[str] = None, quality: int = 85
     ) -> tuple[str, str]:
-        """Encode PIL Image to base64."""
-        buffer = io.BytesIO()
-        if fmt.upper() == "JPEG":
+        """Encode PIL Image to base64, downscaling it to max_image_dim first.
+
+        fmt defaults to the client's image_format.
+
+        Claude resizes images whose long edge exceeds ~1568px server-side,
+        so shrinking them here cuts upload size without changing what the
+        model sees.
+
+        The last few encodings are cached per image object. The agent's
+        parse cache hands back the same annotated image whenever a screen
+        recurs, so a screen the game returns to is not re-encoded. Entries
+        hold weak references and never keep images alive.
+        """
+        fmt = (fmt or self._image_format).upper()
+        key = (id(image), fmt, quality)
+        cached = self._encode_cache.get(key)
+        if cached is not None and cached[0]() is image:
+            self._encode_cache.move_to_end(key)
+            return cached[1]
+        source = image
+
+        longest = max(image.size)
+        if self._max_image_dim and longest > self._max_image_dim:
+            ratio = self._max_image_dim / longest
+            # LANCZOS only pays off on large reductions; BILINEAR is several
+            # times cheaper and indistinguishable for modest ones such as
+            # 1080x2400 down to 706x1568.
+            resample = Image.LANCZOS if ratio < 0.5 else Image.BILINEAR
+            image = image.resize(
+                (round(image.width * ratio), round(image.height * ratio)),
+                resample,
+            )
+
+        buffer = self._encode_buffer
+        buffer.seek(0)
+        buffer.truncate()
+        if fmt == "JPEG":
             if image.mode == "RGBA":
                 image = image.convert("RGB")
             image.save(buffer, format="JPEG", quality=quality)
             media_type = "image/jpeg"
-        else:
+        elif fmt == "WEBP":
+            # method=2 keeps most of the size win at a fraction of the
+            # default effort level's encode time
+            image.save(buffer, format="WEBP", quality=quality, method=2)
+            media_type = "image/webp"
+        elif fmt == "PNG":
             image.save(buffer, format="PNG")
             media_type = "image/png"
-
-        return base64.standard_b64encode(buffer.getvalue()).decode("utf-8"), media_type
+        else:
+            raise ValueError(f"Unsupported image format: {fmt!r}")
+
+        with buffer.getbuffer() as view:
+            b64 = binascii.b2a_base64(view, newline=False).decode("ascii")
+        encoded = b64, media_type
+        self._encode_cache[key] = (weakref.ref(source), encoded)
+        self._encode_cache.move_to_end(key)
+        if len(self._encode_cache) > self._ENCODE_CACHE_SIZE:
+            self._encode_cache.popitem(last=False)
+        return encoded
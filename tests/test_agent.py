@@ -0,0 +1,159 @@
+"""Tests for AgentLoop screenshot handling."""
+
+from PIL import Image, ImageDraw
+
+from andrey.agent import AgentLoop
+from andrey.config import AppConfig
+from andrey.models import ApiResponse, ToolCall
+from andrey.omniparser import ParseResult, UIElement
+
+
+def _agent(mocker, **loop) -> AgentLoop:
+    config = AppConfig()
+    config.omniparser.enabled = False
+    config.save_screenshots = False
+    config.loop.delay_seconds = 0.0
+    for name, value in loop.items():
+        setattr(config.loop, name, value)
+    config.conversation.stabilization_interval = 0.01
+    agent = AgentLoop(config)
+    agent._game_profile = {}
+    agent._device = mocker.Mock()
+    agent._device.screenshot.return_value = Image.new("RGB", (90, 160))
+    agent._conversation = mocker.Mock()
+    return agent
+
+
+def _taps(count: int) -> ApiResponse:
+    return ApiResponse(
+        stop_reason="tool_use",
+        tool_calls=[
+            ToolCall(tool_use_id=f"tap_{i}", tool_name="tap", tool_input={"x": i, "y": i})
+            for i in range(count)
+        ],
+    )
+
+
+def test_observe_last_tool_only_captures_once_per_turn(mocker):
+    agent = _agent(mocker, observe_last_tool_only=True)
+    agent._last_response = _taps(3)
+    capture = mocker.spy(agent, "_capture_stable_screenshot")
+
+    agent._run_step()
+
+    results = agent._conversation.submit_tool_results.call_args.args[0]
+    assert [r["tool_use_id"] for r in results] == ["tap_0", "tap_1", "tap_2"]
+    assert ["image" in r for r in results] == [False, False, True]
+    assert "captured after the last action" in results[0]["text_result"]
+    assert agent._device.execute_action.call_count == 3
+    assert capture.call_count == 1
+
+
+def test_every_tool_call_observed_by_default(mocker):
+    agent = _agent(mocker)
+    agent._last_response = _taps(2)
+    capture = mocker.spy(agent, "_capture_stable_screenshot")
+
+    agent._run_step()
+
+    results = agent._conversation.submit_tool_results.call_args.args[0]
+    assert all("image" in r for r in results)
+    assert capture.call_count == 2
+
+
+def _parsing_agent(mocker, **omniparser) -> AgentLoop:
+    agent = _agent(mocker)
+    for name, value in omniparser.items():
+        setattr(agent._config.omniparser, name, value)
+    agent._omniparser = mocker.Mock(available=True)
+    agent._omniparser.parse.side_effect = lambda image: ParseResult(
+        annotated_image=image,
+        elements=[
+            UIElement(
+                id=0, type="text", content="PLAY", bbox=[0, 0, 10, 10],
+                interactive=True, center_x=5, center_y=5,
+            )
+        ],
+    )
+    return agent
+
+
+def _frame(text: str) -> Image.Image:
+    image = Image.new("RGB", (1080, 2400), (30, 100, 30))
+    ImageDraw.Draw(image).text((500, 1200), text, fill=(255, 255, 255))
+    return image
+
+
+def _parse(agent: AgentLoop, image: Image.Image) -> ParseResult:
+    return agent._parse_screenshot(image, agent._frame_digest(image))
+
+
+def test_parse_cache_reuses_identical_frame(mocker):
+    agent = _parsing_agent(mocker)
+    first = _parse(agent, _frame("Bid: 3"))
+    assert _parse(agent, _frame("Bid: 3")) is first
+    assert agent._omniparser.parse.call_count == 1
+
+
+def test_parse_cache_misses_on_small_text_change(mocker):
+    agent = _parsing_agent(mocker)
+    before, after = _frame("Bid: 3"), _frame("Bid: 4")
+    # Too small a change for the perceptual hash...
+    assert agent._screenshot_hash(before) == agent._screenshot_hash(after)
+
+    # ...but not for the cache key
+    _parse(agent, before)
+    assert _parse(agent, after).annotated_image is after
+    assert agent._omniparser.parse.call_count == 2
+
+
+def test_parse_cache_skips_empty_results(mocker):
+    agent = _parsing_agent(mocker)
+    agent._omniparser.parse.side_effect = lambda image: ParseResult(
+        annotated_image=image, elements=[]
+    )
+    _parse(agent, _frame("loading"))
+    _parse(agent, _frame("loading"))
+    assert agent._omniparser.parse.call_count == 2
+
+
+def test_parse_cache_disabled(mocker):
+    agent = _parsing_agent(mocker, cache_size=0)
+    _parse(agent, _frame("Bid: 3"))
+    _parse(agent, _frame("Bid: 3"))
+    assert agent._omniparser.parse.call_count == 2
+    assert not agent._parse_cache
+
+
+def test_parse_cache_evicts_oldest(mocker):
+    agent = _parsing_agent(mocker, cache_size=2)
+    for text in ("a", "b", "c"):
+        _parse(agent, _frame(text))
+    _parse(agent, _frame("a"))
+    assert agent._omniparser.parse.call_count == 4
+
+
+def test_unchanged_screen_after_input_is_confirmed(mocker, monkeypatch):
+    agent = _agent(mocker)
+    before, after = Image.new("RGB", (90, 160)), Image.new("RGB", (90, 160), "white")
+    agent._last_screenshot_hash = agent._screenshot_hash(before)
+    # The tap's effect shows up from the second capture on
+    agent._device.screenshot.side_effect = [before] + [after] * 10
+    clock = iter(range(1000))
+    monkeypatch.setattr("andrey.agent.time.monotonic", lambda: next(clock) * 0.001)
+    monkeypatch.setattr("andrey.agent.time.sleep", lambda seconds: None)
+    agent._last_input_time = 0.0
+
+    screenshot, _ = agent._capture_stable_screenshot()
+    assert screenshot is after
+
+
+def test_unchanged_screen_long_after_input_returns_at_once(mocker):
+    agent = _agent(mocker)
+    screen = Image.new("RGB", (90, 160))
+    agent._last_screenshot_hash = agent._screenshot_hash(screen)
+    agent._device.screenshot.return_value = screen
+    agent._last_input_time = None
+
+    assert agent._capture_stable_screenshot()[0] is screen
+    assert agent._device.screenshot.call_count == 1
@@ -0,0 +1,79 @@
+"""Tests for DeviceManager raw screencap decoding."""
+
+import struct
+
+import pytest
+
+from andrey.device import DeviceError, DeviceManager
+
+
+def _device(mocker, output: bytes) -> DeviceManager:
+    manager = DeviceManager(raw_screencap=True)
+    manager._device = mocker.Mock()
+    manager._device.shell.return_value = output
+    return manager
+
+
+def _pixels(width: int, height: int) -> bytes:
+    # RGBX pixels; the fourth byte must be dropped
+    return bytes(
+        value
+        for i in range(width * height)
+        for value in (i % 256, 10, 20, 255)
+    )
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        struct.pack("<3I", 3, 2, 1),  # before Android 9
+        struct.pack("<4I", 3, 2, 1, 0),  # with colorspace word
+    ],
+)
+def test_raw_screencap_decodes_header(mocker, header):
+    image = _device(mocker, header + _pixels(3, 2)).screenshot()
+
+    assert image.mode == "RGB"
+    assert image.size == (3, 2)
+    assert image.getpixel((2, 1)) == (5, 10, 20)
+
+
+def test_raw_screencap_rejects_unknown_format(mocker):
+    output = struct.pack("<3I", 3, 2, 4) + _pixels(3, 2)  # RGB_565
+    with pytest.raises(DeviceError, match="raw_screencap"):
+        _device(mocker, output).screenshot()
+
+
+def test_raw_screencap_rejects_truncated_output(mocker):
+    output = struct.pack("<3I", 3, 2, 1) + _pixels(3, 1)
+    with pytest.raises(DeviceError):
+        _device(mocker, output).screenshot()
+
+
+def test_raw_screencap_rejects_short_output(mocker):
+    with pytest.raises(DeviceError):
+        _device(mocker, b"\x00" * 8).screenshot()
+
+
+@pytest.mark.parametrize(
+    "output, package",
+    [
+        (
+            "  mResumedActivity: ActivityRecord{1a2b3c u0 "
+            "com.youxi.spades/.MainActivity t42}",
+            "com.youxi.spades",
+        ),
+        (
+            "  mResumedActivity: ActivityRecord{1a2b3c u0 "
+            "com.example.game/com.unity3d.player.UnityPlayerActivity t7}",
+            "com.example.game",
+        ),
+        ("", None),
+    ],
+)
+def test_foreground_package_parsed_from_dumpsys(mocker, output, package):
+    manager = DeviceManager()
+    manager._device = mocker.Mock()
+    manager._device.shell.return_value = output
+
+    assert manager.get_foreground_package() == package
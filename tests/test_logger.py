@@ -0,0 +1,34 @@
+"""Tests for logging setup."""
+
+import atexit
+import logging
+
+import pytest
+
+from andrey.logger import setup_logging
+
+
+@pytest.fixture
+def exit_hooks(monkeypatch):
+    """Hooks setup_logging registers with atexit, collected instead."""
+    hooks = []
+    monkeypatch.setattr(atexit, "register", hooks.append)
+    yield hooks
+    logger = logging.getLogger("andrey")
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_session_log_gets_plain_level_name(exit_hooks, tmp_path, capsys):
+    setup_logging(log_dir=str(tmp_path))
+    # ERROR is written through without waiting for a full batch
+    logging.getLogger("andrey.test").error("hello")
+    for hook in exit_hooks:
+        hook()  # drains the queue
+
+    line = (tmp_path / "session.log").read_text().strip()
+    assert "\033" not in line
+    assert line.endswith(" ERROR   [andrey.test] hello")
+    # The terminal still gets the colored label
+    assert "\033[31mERROR" in capsys.readouterr().err
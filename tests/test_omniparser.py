@@ -0,0 +1,46 @@
+"""Tests for OmniParserClient result conversion."""
+
+import base64
+import sys
+from io import BytesIO
+from types import ModuleType
+
+import pytest
+from PIL import Image
+
+from andrey.omniparser import OmniParserClient
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def omniparser_utils(monkeypatch):
+    """Stand-in for OmniParser's util.utils returning three elements."""
+    buffer = BytesIO()
+    Image.new("RGB", (100, 200)).save(buffer, format="PNG")
+    labeled = base64.b64encode(buffer.getvalue()).decode()
+    parsed = [
+        {"type": "text", "content": "PLAY", "bbox": [0.1, 0.1, 0.3, 0.2]},
+        {"type": "icon", "content": "Ad", "bbox": [0.1, 0.92, 0.9, 0.98]},
+        {"type": "icon", "content": "Menu", "bbox": [0.7, 0.8, 0.9, 0.88]},
+    ]
+
+    utils = ModuleType("util.utils")
+    utils.check_ocr_box = lambda *args, **kwargs: (([], []), None)
+    utils.get_som_labeled_img = lambda *args, **kwargs: (labeled, None, parsed)
+    monkeypatch.setitem(sys.modules, "util", ModuleType("util"))
+    monkeypatch.setitem(sys.modules, "util.utils", utils)
+
+
+def test_ad_zone_elements_dropped_with_original_ids(omniparser_utils):
+    result = OmniParserClient()._run_detection(Image.new("RGB", (100, 200)))
+
+    assert [(el.id, el.content) for el in result.elements] == [(0, "PLAY"), (2, "Menu")]
+    assert (result.elements[1].center_x, result.elements[1].center_y) == (80, 168)
+
+
+def test_ad_cutoff_disabled_keeps_all(omniparser_utils):
+    client = OmniParserClient(ad_cutoff_ratio=0)
+    result = client._run_detection(Image.new("RGB", (100, 200)))
+
+    assert [el.id for el in result.elements] == [0, 1, 2]
@@ -0,0 +1,260 @@
+"""Tests for ConversationClient history management."""
+
+from types import SimpleNamespace
+
+import anthropic
+import pytest
+from PIL import Image
+
+from andrey.vision import ConversationClient, VisionError
+
+
+def _response(tool_use_id: str):
+    return SimpleNamespace(
+        content=[
+            SimpleNamespace(
+                type="tool_use", id=tool_use_id, name="tap", input={"reasoning": "r"}
+            )
+        ],
+        stop_reason="tool_use",
+        usage=SimpleNamespace(input_tokens=1, output_tokens=1),
+    )
+
+
+def _client(mocker, **kwargs) -> ConversationClient:
+    """ConversationClient whose API answers every request with a tap call."""
+    client = ConversationClient(api_key="test", system_prompt="system", **kwargs)
+    responses = (_response(f"tool_{i}") for i in range(1000))
+    client._client = mocker.Mock()
+    client._client.messages.create.side_effect = lambda **_: next(responses)
+    return client
+
+
+def _submit(client: ConversationClient, response, image_hash: bytes, text: str = ""):
+    return client.submit_tool_results(
+        [
+            {
+                "tool_use_id": response.tool_calls[0].tool_use_id,
+                "text_result": "Tapped.",
+                "image": Image.new("RGB", (8, 8)),
+                "image_hash": image_hash,
+                "elements_text": text,
+            }
+        ]
+    )
+
+
+def _tool_result_blocks(client: ConversationClient) -> list[str]:
+    tool_result = client._messages[-2]["content"][0]
+    return [block["type"] for block in tool_result["content"]]
+
+
+def test_identical_screen_not_uploaded_again(mocker):
+    client = _client(mocker)
+    response = client.send_screenshot(Image.new("RGB", (8, 8)), image_hash=b"same")
+    _submit(client, response, b"same")
+
+    assert _tool_result_blocks(client) == ["text"]
+    tool_result = client._messages[-2]["content"][0]
+    assert "identical" in tool_result["content"][0]["text"]
+
+
+def test_changed_screen_uploaded(mocker):
+    client = _client(mocker)
+    response = client.send_screenshot(Image.new("RGB", (8, 8)), image_hash=b"before")
+    _submit(client, response, b"after")
+
+    assert _tool_result_blocks(client) == ["image", "text"]
+
+
+def test_last_upload_forgotten_once_its_image_is_stripped(mocker):
+    client = _client(mocker, max_images=0)
+    response = client.send_screenshot(Image.new("RGB", (8, 8)), image_hash=b"0")
+    for turn in range(1, ConversationClient._IMAGE_TRIM_SLACK + 1):
+        response = _submit(client, response, bytes([turn]))
+
+    # Claude no longer has the frame, so the next one must be sent again
+    assert client._last_uploaded_hash is None
+    client._trim_conversation = lambda: None
+    _submit(client, response, bytes([ConversationClient._IMAGE_TRIM_SLACK]))
+    assert _tool_result_blocks(client) == ["image", "text"]
+
+
+def _play(client: ConversationClient, turns: int, text: str = ""):
+    """Send a first screenshot, then answer `turns` tool calls with new screens."""
+    response = client.send_screenshot(Image.new("RGB", (8, 8)), text, image_hash=b"0")
+    for turn in range(1, turns + 1):
+        response = _submit(client, response, bytes([turn]), text)
+    return response
+
+
+def _has_image(message: dict) -> bool:
+    for block in message["content"]:
+        if block["type"] == "image":
+            return True
+        if block["type"] == "tool_result" and any(
+            inner["type"] == "image" for inner in block["content"]
+        ):
+            return True
+    return False
+
+
+def test_images_trimmed_back_to_max_images_after_slack(mocker):
+    slack = ConversationClient._IMAGE_TRIM_SLACK
+
+    # One screenshot plus 2 + slack results: at the limit, nothing stripped
+    client = _client(mocker, max_images=3)
+    _play(client, 2 + slack)
+    assert len(client._image_messages) == 3 + slack
+
+    # One more goes over it and trims back to max_images in one go
+    client = _client(mocker, max_images=3)
+    _play(client, 3 + slack)
+    assert len(client._image_messages) == 3
+    assert list(client._image_messages) == [
+        i for i, message in enumerate(client._messages) if _has_image(message)
+    ]
+
+
+def test_cache_breakpoint_not_stored_in_history(mocker):
+    client = _client(mocker)
+    _play(client, 2)
+
+    sent = client._client.messages.create.call_args.kwargs["messages"]
+    assert sent[-1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert sent[:-1] == client._messages[:-2]
+    assert not any(
+        "cache_control" in block
+        for message in client._messages
+        for block in message["content"]
+    )
+
+
+def _assert_history_valid(client: ConversationClient) -> None:
+    messages = client._messages
+    assert messages[0]["role"] == "user"
+    for previous, message in zip(messages, messages[1:]):
+        assert previous["role"] != message["role"]
+        tool_use_ids = [
+            block["tool_use_id"]
+            for block in message["content"]
+            if block["type"] == "tool_result"
+        ]
+        if tool_use_ids:
+            assert [
+                block["id"] for block in previous["content"] if block["type"] == "tool_use"
+            ] == tool_use_ids
+    assert list(client._image_messages) == [
+        i for i, message in enumerate(messages) if _has_image(message)
+    ]
+    assert client._message_tokens == [client._estimate_tokens(m) for m in messages]
+
+
+def test_drop_oldest_turns_keeps_history_valid(mocker):
+    client = _client(mocker, max_images=2, max_context_tokens=8000)
+    _play(client, 12, text="e" * 2000)
+
+    first = client._messages[0]["content"][0]
+    assert first["text"] == "[Earlier turns omitted to save context]"
+    assert client._messages[1]["role"] == "assistant"
+    _assert_history_valid(client)
+
+
+def test_drop_oldest_turns_checked_on_every_request(mocker):
+    client = _client(mocker, max_images=2, max_context_tokens=8000)
+    requests = []
+    create = client._client.messages.create.side_effect
+
+    def record(**kwargs):
+        requests.append(list(kwargs["messages"]))
+        return create(**kwargs)
+
+    client._client.messages.create.side_effect = record
+    _play(client, 12, text="e" * 2000)
+
+    for messages in requests:
+        roles = [message["role"] for message in messages]
+        assert roles[0] == "user"
+        assert all(a != b for a, b in zip(roles, roles[1:]))
+
+
+def test_drop_oldest_turns_keeps_newest_exchange(mocker):
+    client = _client(mocker, max_images=8, max_context_tokens=1)
+    _play(client, 3, text="e" * 2000)
+
+    # placeholder, the last assistant reply and the last tool results
+    assert len(client._messages) == 4
+    _assert_history_valid(client)
+
+
+def test_zero_max_context_tokens_never_drops(mocker):
+    client = _client(mocker, max_images=2, max_context_tokens=0)
+    _play(client, 12, text="e" * 2000)
+
+    assert len(client._messages) == 26
+    _assert_history_valid(client)
+
+
+def test_failed_request_before_drop_keeps_history_valid(mocker):
+    client = _client(mocker, max_images=2, max_context_tokens=8000)
+    response = _play(client, 3, text="e" * 2000)
+
+    create = client._client.messages.create.side_effect
+    client._client.messages.create.side_effect = anthropic.RateLimitError(
+        "rate limited", response=mocker.Mock(status_code=429, headers={}), body=None
+    )
+    with pytest.raises(VisionError):
+        _submit(client, response, b"retry", "e" * 2000)
+    assert client._last_uploaded_hash is None
+
+    # The agent retries the same tool results, then play goes on
+    client._client.messages.create.side_effect = create
+    response = _submit(client, response, b"retry", "e" * 2000)
+    for turn in range(10):
+        response = _submit(client, response, bytes([turn]), "e" * 2000)
+
+    assert client._messages[1]["role"] == "assistant"
+    _assert_history_valid(client)
+
+
+def test_drop_oldest_turns_cuts_before_an_assistant_message(mocker):
+    client = _client(mocker, max_context_tokens=4000)
+    text = [{"type": "text", "text": "e" * 4000}]
+    for role in ("user", "user", "assistant", "user", "assistant", "user"):
+        client._append_message({"role": role, "content": text})
+
+    client._drop_oldest_turns()
+
+    # Two user messages in a row shift the assistant replies to even indices
+    assert [message["role"] for message in client._messages] == [
+        "user", "assistant", "user",
+    ]
+    assert client._messages[0]["content"][0]["text"].startswith("[Earlier turns")
+
+
+def test_last_upload_forgotten_once_its_turn_is_dropped(mocker):
+    client = _client(mocker, max_context_tokens=4000)
+    response = client.send_screenshot(Image.new("RGB", (8, 8)), image_hash=b"same")
+    # Unchanged screens: only the first screenshot carries an image
+    while client._messages[0]["content"][0].get("text") != (
+        "[Earlier turns omitted to save context]"
+    ):
+        response = _submit(client, response, b"same", "e" * 2000)
+
+    assert not client._image_messages
+    assert client._last_uploaded_hash is None
+    _submit(client, response, b"same")
+    assert _tool_result_blocks(client) == ["image", "text"]
+
+
+def test_webp_upload_format(mocker):
+    client = _client(mocker, image_format="webp")
+    client.send_screenshot(Image.new("RGB", (8, 8)))
+
+    image = client._messages[0]["content"][0]
+    assert image["source"]["media_type"] == "image/webp"
+
+
+def test_unsupported_image_format_rejected():
+    with pytest.raises(ValueError):
+        ConversationClient(api_key="test", image_format="jpg")